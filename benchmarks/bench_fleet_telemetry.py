@@ -0,0 +1,139 @@
+"""Benchmark fleet-wide telemetry queries on a synthetic fleet.
+
+Builds a FleetTelemetryStore of N chargers x M snapshots (default 10k x 10k,
+two metrics) directly from NumPy arrays and times the endpoint's queries.
+The app never builds a store that way: it streams the alerts file into alert
+dicts (``_iter_alert_file`` -> ``_apply_alerts``) and builds the store from
+those. That path is timed separately on a generated NDJSON alerts file
+(default 1k alerts x 1k snapshots, five metrics), along with its peak memory
+per snapshot and the largest fleet that fits in the memory given by --ram-gb.
+Measured at roughly 740 B and 4 us per snapshot, that path handles about 20M
+snapshots on a 16 GB host; the 10k x 10k query timings are not reachable
+through it.
+
+Usage:
+    python benchmarks/bench_fleet_telemetry.py [--chargers 10000] [--snapshots 10000]
+                                               [--alerts 1000] [--alert-snapshots 1000] [--ram-gb 16]
+"""
+import argparse
+import json
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import main as app  # noqa: E402
+from main import FleetTelemetryStore, TelemetryColumn  # noqa: E402
+
+
+def build_store(n_chargers: int, n_snapshots: int, seed: int = 0) -> FleetTelemetryStore:
+    rng = np.random.default_rng(seed)
+    # One snapshot every 6 hours, shared by every charger and metric
+    times = np.tile(np.arange(n_snapshots, dtype=np.int32) * 6 * 3600, n_chargers)
+    offsets = np.arange(n_chargers + 1, dtype=np.int64) * n_snapshots
+
+    columns = {}
+    for metric, base, drift in (("pump_rpm", 3200.0, -0.02), ("temperature_c", 45.0, 0.001)):
+        per_charger_drift = rng.normal(drift, abs(drift), n_chargers).astype(np.float32)
+        values = np.empty(n_chargers * n_snapshots, dtype=np.float32)
+        step = np.arange(n_snapshots, dtype=np.float32)
+        for i in range(n_chargers):
+            seg = values[i * n_snapshots:(i + 1) * n_snapshots]
+            seg[:] = base * (1 + per_charger_drift[i] * step / n_snapshots * 10)
+        values += rng.standard_normal(values.size, dtype=np.float32) * np.float32(base * 0.005)
+        columns[metric] = TelemetryColumn(times, values, offsets)
+
+    ids = [f"CHG-{i:05d}" for i in range(n_chargers)]
+    return FleetTelemetryStore(ids, [f"INC-{i:05d}" for i in range(n_chargers)], columns)
+
+
+def write_alerts(path: Path, n_alerts: int, n_snapshots: int, seed: int = 0):
+    """Write an NDJSON alerts file shaped like dummy_data/telemetry_alerts.json."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    stamps = [(start + timedelta(hours=6 * i)).strftime("%Y-%m-%dT%H:%M:%SZ") for i in range(n_snapshots)]
+    with open(path, "w") as f:
+        for i in range(n_alerts):
+            temps, pressures = rng.normal(45, 2, n_snapshots).round(1), rng.normal(2.8, 0.1, n_snapshots).round(2)
+            rpms, volts, amps = (rng.integers(lo, hi, n_snapshots) for lo, hi in ((3000, 3300), (395, 405), (110, 130)))
+            alert = {
+                "ticket_id": f"INC-{i:05d}",
+                "timestamp": stamps[-1],
+                "status": "predicted_failure",
+                "station_info": {"charger_id": f"CHG-{i:05d}"},
+                "telemetry_snapshots": [
+                    {"timestamp": ts, "temperature_c": float(t), "pressure_bar": float(p),
+                     "pump_rpm": int(r), "voltage_dc": int(v), "current_a": int(a)}
+                    for ts, t, p, r, v, a in zip(stamps, temps, pressures, rpms, volts, amps)
+                ],
+            }
+            f.write(json.dumps(alert) + "\n")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_load(n_alerts: int, n_snapshots: int, ram_gb: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "alerts.ndjson"
+        write_alerts(path, n_alerts, n_snapshots)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        app._apply_alerts(app._iter_alert_file(str(path)))
+        elapsed = time.perf_counter() - start
+        rss_delta = peak_rss_mb() - rss_before
+    readings = n_alerts * n_snapshots
+    per_snapshot = rss_delta * 2**20 / readings
+    max_snapshots = ram_gb * 2**30 / per_snapshot
+    print(f"Loaded {n_alerts} alerts x {n_snapshots} snapshots via _apply_alerts "
+          f"(parse + diff + store build) in {elapsed:.2f}s")
+    print(f"  peak RSS +{rss_delta:.0f} MB, ~{per_snapshot:.0f} B per snapshot")
+    print(f"  largest fleet in {ram_gb:g} GB: ~{max_snapshots / 1e6:.0f}M snapshots "
+          f"(e.g. {int(max_snapshots ** 0.5):,} x {int(max_snapshots ** 0.5):,}); "
+          f"10k x 10k would need ~{per_snapshot * 1e8 / 2**30:.0f} GB")
+    app._apply_alerts(iter(()), allow_empty=True)
+
+
+def timed(label: str, fn, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<55} {best * 1000:9.1f} ms  (matched={result['matched']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chargers", type=int, default=10_000)
+    parser.add_argument("--snapshots", type=int, default=10_000)
+    parser.add_argument("--alerts", type=int, default=1_000)
+    parser.add_argument("--alert-snapshots", type=int, default=1_000)
+    parser.add_argument("--ram-gb", type=float, default=16, help="Memory budget for the fleet-size estimate")
+    args = parser.parse_args()
+
+    bench_load(args.alerts, args.alert_snapshots, args.ram_gb)
+
+    start = time.perf_counter()
+    store = build_store(args.chargers, args.snapshots)
+    print(f"Built {args.chargers} x {args.snapshots} store from arrays in {time.perf_counter() - start:.1f}s")
+
+    timed("pump_rpm change_pct over 24h < -10%",
+          lambda: store.query("pump_rpm", "change_pct", op="lt", value=-10, window_hours=24))
+    timed("pump_rpm change_pct over full history < -10%",
+          lambda: store.query("pump_rpm", "change_pct", op="lt", value=-10))
+    timed("top 50 by temperature_c slope",
+          lambda: store.query("temperature_c", "slope", top_k=50))
+    timed("temperature_c max > 46, top 50",
+          lambda: store.query("temperature_c", "max", op="gt", value=46, top_k=50))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark the streaming manual ingestion pipeline on a synthetic corpus.
+
+Generates N manuals (default 10k) by cycling the bundled dummy manuals under
+new charger model names, then ingests them into a throwaway Chroma DB using a
+deterministic fake embedder, so the numbers measure parsing, batching and
+indexing rather than the embedding API.
+
+Usage:
+    python benchmarks/bench_ingest.py [--manuals 10000] [--workers 4] [--batch-size 256]
+"""
+import argparse
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+
+from main import MANUALS_DIR, ingest_manuals  # noqa: E402
+
+
+def build_corpus(target: Path, n_manuals: int):
+    sources = sorted(Path(MANUALS_DIR).glob("*.md"))
+    for i in range(n_manuals):
+        src = sources[i % len(sources)]
+        model, component = src.stem.removesuffix("_Manual").rsplit("_", 1)
+        # Spread files over subdirectories like a real OEM library
+        out = target / f"oem_{i % 100:02d}" / f"{model}_{i:05d}_{component}_Manual.md"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(src.read_text(encoding="utf-8"), encoding="utf-8")
+
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manuals", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="ingest_bench_"))
+    try:
+        corpus, persist = workdir / "manuals", workdir / "chroma"
+        build_corpus(corpus, args.manuals)
+        baseline_rss = peak_rss_mb(resource.RUSAGE_SELF)
+
+        start = time.perf_counter()
+        _, stats = ingest_manuals(
+            DeterministicFakeEmbedding(size=256),
+            manuals_dir=str(corpus),
+            persist_dir=str(persist),
+            batch_size=args.batch_size,
+            workers=args.workers,
+        )
+        elapsed = time.perf_counter() - start
+
+        print(f"Manuals:           {stats['files']}")
+        print(f"Chunks:            {stats['chunks']} in {stats['batches']} batches")
+        print(f"Wall time:         {elapsed:.1f}s")
+        print(f"Throughput:        {stats['files'] / elapsed:.0f} manuals/s, {stats['chunks'] / elapsed:.0f} chunks/s")
+        print(f"Peak RSS (main):   {peak_rss_mb(resource.RUSAGE_SELF):.0f} MB (before ingest: {baseline_rss:.0f} MB)")
+        print(f"Peak RSS (worker): {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
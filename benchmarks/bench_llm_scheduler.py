@@ -0,0 +1,93 @@
+"""Check that the LLM scheduler sheds a burst quickly without starving other routes.
+
+Fires a burst of concurrent chats at the app (in-process ASGI, same AnyIO
+threadpool as uvicorn) with a fake LLM that sleeps, a small concurrency
+budget and a queue smaller than the burst. Reports how fast overflow 429s
+come back and how long an unrelated GET /api/tickets takes mid-burst.
+
+Usage:
+    python benchmarks/bench_llm_scheduler.py [--chats 120] [--llm-seconds 3]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import httpx  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+
+import main  # noqa: E402
+
+
+class _NoRetrieval:
+    def as_retriever(self, **kwargs):
+        return self
+
+    def invoke(self, query):
+        return []
+
+
+class _SleepyLLM:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def invoke(self, messages):
+        time.sleep(self.seconds)
+        return AIMessage(content="Check the coolant pump.")
+
+
+async def run(args):
+    main._load_alerts()
+    main.vector_store = _NoRetrieval()
+    main.llm = _SleepyLLM(args.llm_seconds)
+    main.llm_scheduler = main.LLMScheduler(
+        max_concurrency=args.concurrency, max_queue=args.max_queue, queue_timeout_s=args.queue_timeout,
+    )
+    ticket_ids = [t["ticket_id"] for t in main.raw_alerts]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def chat(i: int):
+            start = time.perf_counter()
+            r = await client.post("/api/chat", json={
+                "message": "Pump is noisy", "ticket_id": ticket_ids[i % len(ticket_ids)],
+            }, headers={"X-Technician-Id": f"tech-{i}"})
+            return r.status_code, time.perf_counter() - start, r.json().get("detail", "")
+
+        burst = [asyncio.create_task(chat(i)) for i in range(args.chats)]
+        await asyncio.sleep(0.5)
+        start = time.perf_counter()
+        r = await client.get("/api/tickets")
+        tickets_latency = time.perf_counter() - start
+        metrics = (await client.get("/api/llm/scheduler")).json()
+        results = await asyncio.gather(*burst)
+
+    ok = [t for code, t, _ in results if code == 200]
+    overflow = [t for code, t, d in results if code == 429 and "Timed out" not in d]
+    timed_out = [t for code, t, d in results if code == 429 and "Timed out" in d]
+    print(f"Burst: {args.chats} chats, concurrency {args.concurrency}, queue {args.max_queue}, "
+          f"LLM {args.llm_seconds}s, queue timeout {args.queue_timeout}s")
+    print(f"  mid-burst queue depth:        {metrics['queued']} (running {metrics['running']})")
+    print(f"  GET /api/tickets mid-burst:   {tickets_latency * 1000:.1f} ms (status {r.status_code})")
+    print(f"  200 OK:                       {len(ok)}")
+    if overflow:
+        print(f"  429 queue overflow:           {len(overflow)}, "
+              f"median {statistics.median(overflow) * 1000:.1f} ms, max {max(overflow) * 1000:.1f} ms")
+    print(f"  429 queue timeout:            {len(timed_out)}")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=120)
+    parser.add_argument("--llm-seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=main.LLM_MAX_QUEUE)
+    parser.add_argument("--queue-timeout", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,161 @@
+"""Stress-test and benchmark concurrent ticket state access.
+
+Runs thousands of concurrent checklist updates and chat turns through the
+real handlers and checks the invariants the per-ticket locks guarantee:
+
+  - a ticket is 'completed' exactly when all its checklist items are
+    (verified continuously by a checker thread that holds the ticket lock)
+  - chat history grows by whole user/assistant pairs, never interleaved
+
+Then compares checklist-update throughput on 1 ticket vs many tickets, with
+striped locks and with a single global lock.
+
+Chat turns use a fake LLM and a Chroma index built with a fake embedder, so
+no API key is needed.
+
+Usage:
+    python benchmarks/bench_ticket_state.py [--threads 16] [--ops 5000]
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.language_models import FakeListChatModel  # noqa: E402
+
+import main  # noqa: E402
+
+CHECKLIST_LEN = 6
+
+
+def seed(ticket_ids: list[str]):
+    for tid in ticket_ids:
+        main.ticket_states[tid] = "in_progress"
+        main.ticket_checklists[tid] = [
+            {"task": f"Step {i}", "completed": False, "notes": ""} for i in range(CHECKLIST_LEN)
+        ]
+        main.chat_histories.pop(tid, None)
+
+
+def checklist_op(tid: str, rng: random.Random):
+    main.update_checklist_item(
+        tid, rng.randrange(CHECKLIST_LEN),
+        main.ChecklistUpdateRequest(completed=rng.random() < 0.7, notes=None),
+    )
+
+
+def chat_op(tid: str, rng: random.Random):
+    # The threadpool half of the chat endpoint; the async half only waits
+    # for an LLM scheduler slot and does not touch ticket state.
+    main._answer_chat(
+        main.ChatRequest(message="done", ticket_id=tid, step_idx=rng.randrange(CHECKLIST_LEN)),
+        main._get_ticket_by_id(tid),
+        {"tokens": None},
+    )
+
+
+def stress(ticket_ids: list[str], threads: int, ops: int) -> dict:
+    seed(ticket_ids)
+    chats = {tid: 0 for tid in ticket_ids}
+    chats_lock = threading.Lock()
+    stop = threading.Event()
+    violations: list[str] = []
+
+    def checker():
+        while not stop.is_set():
+            tid = random.choice(ticket_ids)
+            with main.ticket_locks.lock(tid):
+                done = all(item["completed"] for item in main.ticket_checklists[tid])
+                if done != (main.ticket_states[tid] == "completed"):
+                    violations.append(f"{tid}: all_completed={done} status={main.ticket_states[tid]}")
+
+    def work(seed_value: int):
+        rng = random.Random(seed_value)
+        tid = rng.choice(ticket_ids)
+        if rng.random() < 0.3:
+            chat_op(tid, rng)
+            with chats_lock:
+                chats[tid] += 1
+        else:
+            checklist_op(tid, rng)
+
+    checker_thread = threading.Thread(target=checker)
+    checker_thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, range(ops)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    checker_thread.join()
+
+    for tid in ticket_ids:
+        history = main.chat_histories.get(tid, [])
+        if len(history) != 2 * chats[tid]:
+            violations.append(f"{tid}: {len(history)} messages for {chats[tid]} chat turns")
+        for user, assistant in zip(history[::2], history[1::2]):
+            if (user["role"], assistant["role"]) != ("user", "assistant") or user["timestamp"] != assistant["timestamp"]:
+                violations.append(f"{tid}: interleaved chat history")
+                break
+    return {"elapsed": elapsed, "violations": violations}
+
+
+def throughput(ticket_ids: list[str], threads: int, ops: int) -> float:
+    seed(ticket_ids)
+
+    def work(seed_value: int):
+        rng = random.Random(seed_value)
+        checklist_op(rng.choice(ticket_ids), rng)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, range(ops)))
+    return ops / (time.perf_counter() - start)
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="state_bench_")
+    try:
+        main.vector_store, _ = main.ingest_manuals(
+            DeterministicFakeEmbedding(size=32), persist_dir=workdir, workers=1,
+        )
+        main.llm = FakeListChatModel(
+            responses=[f"Looks good. [STEP_COMPLETE:{i}]" for i in range(CHECKLIST_LEN)] + ["Keep going."]
+        )
+        # Tickets must exist for the chat handler
+        main._load_alerts()
+        tickets = [f"INC-{i:04d}" for i in range(64)]
+        for tid in tickets:
+            main.alerts_by_id[tid] = {**main.raw_alerts[0], "ticket_id": tid}
+
+        for label, ids in (("1 ticket", tickets[:1]), ("64 tickets", tickets)):
+            result = stress(ids, args.threads, args.ops)
+            status = "OK" if not result["violations"] else f"{len(result['violations'])} VIOLATIONS"
+            print(f"Stress {label:<11} {args.ops} ops x {args.threads} threads: {result['elapsed']:.2f}s  {status}")
+            for v in result["violations"][:10]:
+                print(f"  {v}")
+
+        print()
+        print(f"Checklist update throughput ({args.threads} threads, {args.ops} ops):")
+        for stripes in (main.TICKET_LOCK_STRIPES, 1):
+            main.ticket_locks = main.TicketLocks(stripes)
+            for label, ids in (("1 ticket", tickets[:1]), ("64 tickets", tickets)):
+                rate = throughput(ids, args.threads, args.ops)
+                print(f"  {stripes:>2} stripe(s), {label:<11} {rate:10.0f} ops/s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_()
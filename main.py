@@ -1,13 +1,32 @@
 import os
 import re
 import json
+import time
+import bisect
+import random
+import asyncio
+import cProfile
+import pstats
+import threading
+import tracemalloc
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache, wraps
+from itertools import repeat
+from operator import itemgetter
 from typing import Optional
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Query
+import numpy as np
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
@@ -80,6 +99,13 @@ class ChatResponse(BaseModel):
     completed_steps: list[int] = []  # indices of checklist steps auto-completed by the AI
     sources: list[str] = []  # source document references used in the answer
 
+class ProfilingConfigRequest(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(0.01, ge=0.0, le=1.0, description="Default fraction of requests to profile")
+    route_rates: dict[str, float] = {}  # per-route overrides keyed by route path, e.g. "/api/chat"
+    memory: bool = False  # also trace allocations with tracemalloc
+    clear: bool = False  # drop previously collected samples
+
 # ──────────────────────────────────────────────
 # In-Memory State Store
 # ──────────────────────────────────────────────
@@ -93,9 +119,66 @@ ticket_checklists: dict[str, list[dict]] = {}
 # Maps ticket_id -> list of ChatMessage dicts
 chat_histories: dict[str, list[dict]] = {}
 
-# The raw alerts loaded from JSON (populated on startup)
+# The three dicts above are only accessed under ticket_locks.lock(ticket_id)
+TICKET_LOCK_STRIPES = 64
+
+
+class TicketLocks:
+    """Striped per-ticket locks.
+
+    Each ticket maps to one of ``stripes`` locks, so updates to the same
+    ticket are serialized while unrelated tickets rarely contend. Locks are
+    re-entrant so helpers can be called from code already holding them.
+    """
+
+    def __init__(self, stripes: int = TICKET_LOCK_STRIPES):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def _index(self, ticket_id: str) -> int:
+        return zlib.crc32(ticket_id.encode()) % len(self._locks)
+
+    def lock(self, ticket_id: str) -> threading.RLock:
+        return self._locks[self._index(ticket_id)]
+
+    @contextmanager
+    def _hold(self, locks: list[threading.RLock]):
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def lock_many(self, ticket_ids):
+        """Hold the stripes covering ``ticket_ids`` (in stripe order, to avoid deadlock)."""
+        return self._hold([self._locks[i] for i in sorted({self._index(tid) for tid in ticket_ids})])
+
+    def lock_all(self):
+        """Hold every stripe (in a fixed order, to avoid deadlock)."""
+        return self._hold(self._locks)
+
+
+ticket_locks = TicketLocks()
+
+
+def _ticket_status(ticket_id: str) -> Optional[str]:
+    """Read a ticket's in-memory status under its lock (None if it has none)."""
+    with ticket_locks.lock(ticket_id):
+        return ticket_states.get(ticket_id)
+
+# The raw alerts loaded from JSON (populated on startup, swapped on reload)
 raw_alerts: list[dict] = []
 
+# Maps ticket_id -> alert dict (same objects as raw_alerts)
+alerts_by_id: dict[str, dict] = {}
+
+# Serializes alert reloads
+_alerts_lock = threading.Lock()
+
+# Columnar telemetry across every charger (rebuilt whenever alerts are loaded)
+fleet_telemetry: "FleetTelemetryStore | None" = None
+
 VALID_STATUSES = {"predicted_failure", "in_progress", "completed", "offline"}
 URGENCY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
 
@@ -105,7 +188,9 @@ URGENCY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
 
 DATA_DIR = "dummy_data"
 MANUALS_DIR = os.path.join(DATA_DIR, "manuals")
-ALERTS_FILE = os.path.join(DATA_DIR, "telemetry_alerts.json")
+ALERTS_FILE = os.getenv("ALERTS_FILE", os.path.join(DATA_DIR, "telemetry_alerts.json"))
+# Seconds between alerts-file change checks (0 disables the watcher)
+ALERTS_WATCH_INTERVAL_S = float(os.getenv("ALERTS_WATCH_INTERVAL_S", "5"))
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
 ADMIN_SECRET = os.getenv("ADMIN_SECRET", "sachack2026")
 CHROMA_PERSIST_DIR = "./chroma_db"
@@ -183,33 +268,633 @@ def _build_telemetry_summary(ticket: dict) -> str:
     return "\n".join(lines)
 
 
-def _load_alerts() -> list[dict]:
-    """Load alerts from JSON file and initialize in-memory state."""
-    global raw_alerts
-    with open(ALERTS_FILE, "r") as f:
-        raw_alerts = json.load(f)
-    # Initialize ticket states from original data
-    for alert in raw_alerts:
-        tid = alert["ticket_id"]
-        if tid not in ticket_states:
-            ticket_states[tid] = alert["status"]
+def _iter_alert_file(path: str, chunk_size: int = 1 << 16):
+    """Stream alert objects from ``path`` without loading the whole file.
+
+    Accepts either a JSON array of alerts or NDJSON (one alert per line).
+    Only one read chunk plus the alert being decoded is held in memory. An
+    alert larger than a chunk is read in geometrically growing pieces, so it
+    is re-decoded O(log n) times rather than once per chunk.
+    A JSON array missing its closing ']' (a file caught mid-write) raises.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof, in_array = "", 0, False, False
+        while True:
+            # Skip whitespace and separators, refilling the buffer as needed
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+            if pos >= len(buf):
+                if in_array:
+                    raise ValueError(f"{path} ended before the alert array was closed")
+                return
+            ch = buf[pos]
+            if ch == "[" and not in_array:
+                in_array, pos = True, pos + 1
+                continue
+            if ch == "]" and in_array:
+                return
+            if ch != "{":
+                raise ValueError(f"Unexpected character {ch!r} in {path}")
+            try:
+                alert, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Alert spans the chunk boundary: keep its head and at least
+                # double it before decoding from the start again
+                more = f.read(max(chunk_size, len(buf) - pos))
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield alert
+
+
+def _apply_alerts(alerts, retain_in_flight: bool = True, allow_empty: bool = False) -> dict:
+    """Diff streamed alerts against the current set and swap them in atomically.
+
+    Unchanged alerts keep their existing dict, so peak memory is roughly the
+    current set plus whatever changed. ``ticket_states`` is only overwritten
+    for tickets whose status was never changed locally; removed tickets that
+    a technician is working on (``in_progress``) are retained. That check and
+    the removal happen under the same ticket locks, and ``alerts_by_id`` is
+    swapped before they are released, so a ticket picked up mid-reload is
+    never dropped and a dropped ticket cannot be written to again.
+
+    An empty alert set would drop every ticket along with its checklist and
+    chat history, so it raises unless ``allow_empty`` is set.
+    """
+    global raw_alerts, alerts_by_id, fleet_telemetry
+    with _alerts_lock:
+        old_by_id = alerts_by_id
+        new_by_id: dict[str, dict] = {}
+        added: list[str] = []
+        updated: list[str] = []
+        for alert in alerts:
+            tid = alert.get("ticket_id")
+            if not tid:
+                raise ValueError("Alert without a ticket_id")
+            old = old_by_id.get(tid)
+            if old is None:
+                if tid not in new_by_id:
+                    added.append(tid)
+            elif old == alert:
+                alert = old
+            elif tid not in new_by_id:
+                updated.append(tid)
+            new_by_id[tid] = alert
+
+        if not new_by_id and old_by_id and not allow_empty:
+            raise ValueError(
+                f"Alerts file contains no alerts; refusing to remove all {len(old_by_id)} tickets"
+            )
+
+        def in_flight(tid: str) -> bool:
+            return retain_in_flight and ticket_states.get(tid) == "in_progress"
+
+        # Build the fleet store before touching shared state. Which removed
+        # tickets survive is only a guess here; it is decided again below.
+        dropped = [tid for tid in old_by_id if tid not in new_by_id]
+        guessed = []
+        for tid in dropped:
+            with ticket_locks.lock(tid):
+                if in_flight(tid):
+                    guessed.append(tid)
+        if not added and not updated and guessed == dropped and fleet_telemetry is not None:
+            # Same alerts as before (e.g. the file was only touched)
+            new_fleet = fleet_telemetry
+        else:
+            new_fleet = FleetTelemetryStore.from_alerts(
+                [*new_by_id.values(), *(old_by_id[tid] for tid in guessed)]
+            )
+
+        for tid in added:
+            with ticket_locks.lock(tid):
+                ticket_states.setdefault(tid, new_by_id[tid]["status"])
+        for tid in updated:
+            with ticket_locks.lock(tid):
+                if ticket_states.get(tid) == old_by_id[tid]["status"]:
+                    ticket_states[tid] = new_by_id[tid]["status"]
+
+        removed: list[str] = []
+        retained: list[str] = []
+        with ticket_locks.lock_many(dropped):
+            for tid in dropped:
+                if in_flight(tid):
+                    retained.append(tid)
+                    new_by_id[tid] = old_by_id[tid]
+                else:
+                    removed.append(tid)
+                    ticket_states.pop(tid, None)
+                    ticket_checklists.pop(tid, None)
+                    chat_histories.pop(tid, None)
+            new_alerts = list(new_by_id.values())
+            alerts_by_id = new_by_id
+            raw_alerts = new_alerts
+
+        if retained != guessed:
+            new_fleet = FleetTelemetryStore.from_alerts(new_alerts)
+        fleet_telemetry = new_fleet
+
+    return {
+        "total": len(new_alerts),
+        "added": added,
+        "updated": updated,
+        "removed": removed,
+        "retained_in_flight": retained,
+    }
+
+
+def _load_alerts(path: str = ALERTS_FILE, allow_empty: bool = False) -> list[dict]:
+    """Stream alerts from ``path`` (JSON array or NDJSON) and apply them to the
+    in-memory state. Safe to call again while serving to hot-reload."""
+    summary = _apply_alerts(_iter_alert_file(path), allow_empty=allow_empty)
+    print(
+        f"Alerts loaded from {path}: {summary['total']} total, {len(summary['added'])} added, "
+        f"{len(summary['updated'])} updated, {len(summary['removed'])} removed."
+    )
     return raw_alerts
 
 
 def _get_ticket_by_id(ticket_id: str) -> dict | None:
     """Find a ticket by ID from raw alerts."""
-    return next((t for t in raw_alerts if t["ticket_id"] == ticket_id), None)
+    return alerts_by_id.get(ticket_id)
 
 
 def _enrich_ticket(ticket: dict) -> dict:
     """Overlay the in-memory status onto a ticket dict."""
     enriched = dict(ticket)
-    tid = enriched["ticket_id"]
-    if tid in ticket_states:
-        enriched["status"] = ticket_states[tid]
+    status = _ticket_status(enriched["ticket_id"])
+    if status is not None:
+        enriched["status"] = status
     return enriched
 
 
+# ──────────────────────────────────────────────
+# Fleet Telemetry Store
+# ──────────────────────────────────────────────
+
+FLEET_STATS = {"count", "first", "last", "min", "max", "mean", "slope", "change", "change_pct"}
+FLEET_OPS = {"lt", "le", "gt", "ge", "eq"}
+
+# Stats are reduced over blocks of chargers holding at most this many
+# readings, so float64 temporaries stay bounded on very large fleets.
+_FLEET_BLOCK_READINGS = 1 << 22
+
+
+# Reading types taken as-is when building columns (bools are not readings)
+_NUMERIC_OR_NULL = {int, float, type(None)}
+
+
+def _parse_timestamp(value: str) -> int:
+    """Parse an ISO-8601 timestamp (with a trailing 'Z') into epoch seconds."""
+    return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+
+
+class TelemetryColumn:
+    """One metric across the whole fleet, stored column-wise.
+
+    Readings are laid out charger after charger (CSR style): the readings of
+    charger ``i`` live in ``times[offsets[i]:offsets[i + 1]]`` and the matching
+    slice of ``values``, sorted by time. Null readings are dropped, so chargers
+    that never report the metric simply have an empty segment.
+    """
+
+    def __init__(self, times: np.ndarray, values: np.ndarray, offsets: np.ndarray):
+        self.times = times      # int32 seconds since the store's base epoch
+        self.values = values    # float32
+        self.offsets = offsets  # int64, len == n_chargers + 1
+        self.counts = np.diff(offsets)
+        self.stats = self._compute_stats()
+
+    def _compute_stats(self) -> dict[str, np.ndarray]:
+        """Precompute whole-history per-charger stats so queries are O(chargers)."""
+        n = len(self.counts)
+        stats = {
+            "count": self.counts.astype(np.float64),
+            "first": np.full(n, np.nan),
+            "last": np.full(n, np.nan),
+            "min": np.full(n, np.nan),
+            "max": np.full(n, np.nan),
+            "mean": np.full(n, np.nan),
+            "slope": np.full(n, np.nan),
+        }
+        has_data = self.counts > 0
+        starts, ends = self.offsets[:-1], self.offsets[1:]
+        stats["first"][has_data] = self.values[starts[has_data]]
+        stats["last"][has_data] = self.values[ends[has_data] - 1]
+
+        # Walk the fleet in blocks of chargers so temporaries stay bounded
+        block_edges = np.searchsorted(
+            self.offsets,
+            np.arange(0, self.offsets[-1], _FLEET_BLOCK_READINGS),
+            side="right",
+        ) - 1
+        block_edges = np.unique(np.concatenate(([0], block_edges, [n])))
+        for lo, hi in zip(block_edges[:-1], block_edges[1:]):
+            idx = np.arange(lo, hi)[has_data[lo:hi]]
+            if idx.size == 0:
+                continue
+            base = self.offsets[lo]
+            seg_starts = self.offsets[idx] - base
+            counts = self.counts[idx]
+            v = self.values[base:self.offsets[hi]].astype(np.float64)
+            # Hours relative to each charger's first reading keeps the
+            # least-squares sums well conditioned.
+            t = self.times[base:self.offsets[hi]].astype(np.float64)
+            t -= np.repeat(t[seg_starts], counts)
+            t /= 3600.0
+
+            sum_v = np.add.reduceat(v, seg_starts)
+            sum_t = np.add.reduceat(t, seg_starts)
+            sum_tv = np.add.reduceat(t * v, seg_starts)
+            sum_tt = np.add.reduceat(t * t, seg_starts)
+            stats["min"][idx] = np.minimum.reduceat(v, seg_starts)
+            stats["max"][idx] = np.maximum.reduceat(v, seg_starts)
+            stats["mean"][idx] = sum_v / counts
+
+            denom = counts * sum_tt - sum_t * sum_t
+            with np.errstate(divide="ignore", invalid="ignore"):
+                slope = (counts * sum_tv - sum_t * sum_v) / denom
+            slope[denom <= 0] = np.nan
+            stats["slope"][idx] = slope
+        return stats
+
+    def change(self, window_hours: Optional[float], pct: bool) -> np.ndarray:
+        """Per-charger change from the reading ``window_hours`` before the
+        latest one (or the first reading when no window is given) to the latest.
+
+        Chargers without a reading at or before the window start get NaN.
+        """
+        n = len(self.counts)
+        result = np.full(n, np.nan)
+        has_data = self.counts > 0
+        starts = self.offsets[:-1][has_data]
+        ends = self.offsets[1:][has_data]
+        last = self.values[ends - 1].astype(np.float64)
+
+        if window_hours is None:
+            baseline_idx = starts
+            valid = np.ones(len(starts), dtype=bool)
+        else:
+            # Vectorized binary search within every charger's segment for the
+            # first reading newer than the window start.
+            target = self.times[ends - 1].astype(np.int64) - int(window_hours * 3600)
+            lo, hi = starts.copy(), ends.copy()
+            active = lo < hi
+            while active.any():
+                mid = (lo + hi) // 2
+                mid[~active] = 0
+                go_right = active & (self.times[mid] <= target)
+                lo = np.where(go_right, mid + 1, lo)
+                hi = np.where(active & ~go_right, mid, hi)
+                active = lo < hi
+            baseline_idx = lo - 1
+            valid = baseline_idx >= starts
+            baseline_idx = np.where(valid, baseline_idx, starts)
+
+        baseline = self.values[baseline_idx].astype(np.float64)
+        delta = last - baseline
+        if pct:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                delta = delta / np.abs(baseline) * 100
+            delta[baseline == 0] = np.nan
+        delta[~valid] = np.nan
+        result[has_data] = delta
+        return result
+
+
+class FleetTelemetryStore:
+    """Columnar telemetry for every charger in the fleet.
+
+    Chargers are indexed ``0..n-1`` (aligned with ``charger_ids``) and each
+    metric is a ``TelemetryColumn`` over that same index, so every query is a
+    handful of vectorized NumPy operations instead of a loop over tickets.
+    """
+
+    def __init__(
+        self,
+        charger_ids: list[str],
+        ticket_ids: list[str],
+        columns: dict[str, TelemetryColumn],
+        base_epoch: int = 0,
+    ):
+        self.charger_ids = np.asarray(charger_ids, dtype=object)
+        self.ticket_ids = np.asarray(ticket_ids, dtype=object)
+        self.columns = columns
+        self.base_epoch = base_epoch
+
+    @classmethod
+    def from_alerts(cls, alerts: list[dict]) -> "FleetTelemetryStore":
+        """Build the store from raw alert dicts.
+
+        Snapshots from several tickets on the same charger are merged (a later
+        alert wins on a duplicate timestamp); the most recent ticket is
+        reported as the charger's ticket. Each alert is turned into one array
+        per metric, and the columns are assembled with a single sort.
+
+        Scale is bounded by the alert dicts the app keeps resident, not by
+        the columns: loading through ``_apply_alerts`` peaks at roughly 740 B
+        and 4 us per snapshot (five metrics). A 16 GB host therefore tops out
+        near 20M snapshots (about 4.5k chargers x 4.5k snapshots); 10k x 10k
+        would need about 70 GB. See benchmarks/bench_fleet_telemetry.py.
+        """
+        parse_ts = lru_cache(maxsize=None)(_parse_timestamp)
+        charger_index: dict[str, int] = {}
+        latest: list[tuple[str, str]] = []  # (alert timestamp, ticket_id) per charger
+        parts: dict[str, tuple[list, list, list]] = {}  # metric -> owners, times, values
+
+        for alert in alerts:
+            charger_id = alert["station_info"]["charger_id"]
+            ci = charger_index.setdefault(charger_id, len(charger_index))
+            if ci == len(latest):
+                latest.append((alert["timestamp"], alert["ticket_id"]))
+            elif alert["timestamp"] >= latest[ci][0]:
+                latest[ci] = (alert["timestamp"], alert["ticket_id"])
+
+            snaps = [s for s in alert.get("telemetry_snapshots", []) if "timestamp" in s]
+            if not snaps:
+                continue
+            times = np.fromiter(map(parse_ts, map(itemgetter("timestamp"), snaps)), np.int64, len(snaps))
+            keys = set().union(*snaps)
+            keys.discard("timestamp")
+            for key in keys:
+                raw = list(map(dict.get, snaps, repeat(key)))
+                types = set(map(type, raw))
+                if types <= _NUMERIC_OR_NULL:
+                    values = np.array(raw, dtype=np.float64)  # None becomes NaN
+                elif types & _NUMERIC_OR_NULL - {type(None)}:
+                    values = np.fromiter(
+                        (v if type(v) in (int, float) else np.nan for v in raw), np.float64, len(raw)
+                    )
+                else:
+                    continue
+                present = ~np.isnan(values)
+                if not present.any():
+                    continue
+                owners, metric_times, metric_values = parts.setdefault(key, ([], [], []))
+                owners.append(np.full(int(present.sum()), ci, dtype=np.int64))
+                metric_times.append(times[present])
+                metric_values.append(values[present])
+
+        charger_ids = sorted(charger_index)
+        # Charger position in sorted order, indexed by first-seen order
+        rank = np.empty(len(charger_ids), dtype=np.int64)
+        rank[[charger_index[c] for c in charger_ids]] = np.arange(len(charger_ids))
+        base_epoch = min((int(t.min()) for _, ts, _ in parts.values() for t in ts), default=0)
+
+        columns: dict[str, TelemetryColumn] = {}
+        for metric in sorted(parts):
+            owners, times, values = (np.concatenate(p) for p in parts[metric])
+            owners = rank[owners]
+            order = np.lexsort((times, owners))  # stable: later alerts stay last
+            owners, times, values = owners[order], times[order], values[order]
+            # Keep the last reading of each (charger, timestamp) pair
+            last = np.ones(len(times), dtype=bool)
+            last[:-1] = (owners[1:] != owners[:-1]) | (times[1:] != times[:-1])
+            owners, times, values = owners[last], times[last], values[last]
+            columns[metric] = TelemetryColumn(
+                (times - base_epoch).astype(np.int32),
+                values.astype(np.float32),
+                np.searchsorted(owners, np.arange(len(charger_ids) + 1)).astype(np.int64),
+            )
+
+        return cls(
+            charger_ids,
+            [latest[charger_index[c]][1] for c in charger_ids],
+            columns,
+            base_epoch,
+        )
+
+    @property
+    def metrics(self) -> list[str]:
+        return sorted(self.columns)
+
+    def aggregate(self, metric: str, stat: str, window_hours: Optional[float] = None) -> np.ndarray:
+        """Return one value per charger (NaN where the charger lacks data)."""
+        column = self.columns[metric]
+        if stat == "change":
+            return column.change(window_hours, pct=False)
+        if stat == "change_pct":
+            return column.change(window_hours, pct=True)
+        return column.stats[stat]
+
+    def query(
+        self,
+        metric: str,
+        stat: str,
+        op: Optional[str] = None,
+        value: Optional[float] = None,
+        top_k: int = 50,
+        order: str = "desc",
+        window_hours: Optional[float] = None,
+    ) -> dict:
+        """Filter chargers by ``stat <op> value`` and return the top ``top_k``
+        matches ordered by the stat.
+        """
+        values = self.aggregate(metric, stat, window_hours)
+        mask = ~np.isnan(values)
+        if op is not None:
+            mask &= {
+                "lt": np.less, "le": np.less_equal, "gt": np.greater,
+                "ge": np.greater_equal, "eq": np.equal,
+            }[op](values, value)
+
+        matched_idx = np.flatnonzero(mask)
+        matched_vals = values[matched_idx]
+        sort_vals = -matched_vals if order == "desc" else matched_vals
+        if top_k < len(matched_idx):
+            part = np.argpartition(sort_vals, top_k)[:top_k]
+            matched_idx, matched_vals, sort_vals = matched_idx[part], matched_vals[part], sort_vals[part]
+        ranked = np.argsort(sort_vals, kind="stable")
+
+        return {
+            "metric": metric,
+            "stat": stat,
+            "window_hours": window_hours,
+            "matched": int(mask.sum()),
+            "results": [
+                {
+                    "charger_id": self.charger_ids[i],
+                    "ticket_id": self.ticket_ids[i],
+                    "value": float(v),
+                }
+                for i, v in zip(matched_idx[ranked], matched_vals[ranked])
+            ],
+        }
+
+
+# ──────────────────────────────────────────────
+# Manual Ingestion
+# ──────────────────────────────────────────────
+
+INGEST_BATCH_SIZE = 256        # chunks per embed + index call
+INGEST_CHECKPOINT_FILE = "ingest_checkpoint.json"
+_MANUAL_CHUNK_SIZE = 1500
+
+
+@lru_cache(maxsize=1)
+def _manual_splitters() -> tuple[MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter]:
+    """Build the splitters once per process (workers each get their own)."""
+    # ── Fix 3: Markdown-aware splitting ──
+    # First split by markdown headers to keep sections intact,
+    # then sub-split any oversized sections with character-based splitter.
+    md_header_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=[
+            ("#", "manual_title"),
+            ("##", "doc_type"),
+            ("###", "section"),
+        ],
+        strip_headers=False,  # keep headers in the chunk text for context
+    )
+    # Sub-splitter for sections that exceed the chunk size
+    sub_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=_MANUAL_CHUNK_SIZE,  # larger chunks to keep procedures intact
+        chunk_overlap=200,
+    )
+    return md_header_splitter, sub_splitter
+
+
+def _split_manual(filepath: str) -> tuple[str, list[Document]]:
+    """Parse one manual into chunk Documents. Runs inside the process pool."""
+    md_header_splitter, sub_splitter = _manual_splitters()
+    path = Path(filepath)
+    raw_text = path.read_text(encoding="utf-8")
+
+    # ── Fix 2: Parse metadata from filename ──
+    file_meta = _parse_manual_metadata(filepath)
+
+    documents: list[Document] = []
+    # Split by headers first
+    for chunk in md_header_splitter.split_text(raw_text):
+        # Merge file-level metadata with header metadata
+        merged_meta = {**file_meta, **chunk.metadata}
+        # Also store the source filename for Fix 4
+        merged_meta["source"] = path.name
+
+        # Sub-split if the chunk is too large
+        if len(chunk.page_content) > _MANUAL_CHUNK_SIZE:
+            pieces = sub_splitter.split_text(chunk.page_content)
+        else:
+            pieces = [chunk.page_content]
+        documents.extend(Document(page_content=p, metadata=merged_meta) for p in pieces)
+    return filepath, documents
+
+
+def _read_checkpoint(persist_dir: str) -> dict:
+    path = Path(persist_dir) / INGEST_CHECKPOINT_FILE
+    if not path.exists():
+        return {"done": [], "failed": {}, "complete": False}
+    return {"failed": {}, **json.loads(path.read_text())}
+
+
+def _write_checkpoint(
+    persist_dir: str, done: set[str], complete: bool, failed: Optional[dict[str, str]] = None,
+):
+    # Write-then-rename so a crash mid-write never corrupts the checkpoint
+    path = Path(persist_dir) / INGEST_CHECKPOINT_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"done": sorted(done), "failed": failed or {}, "complete": complete}))
+    os.replace(tmp, path)
+
+
+def ingest_manuals(
+    embeddings,
+    manuals_dir: str = MANUALS_DIR,
+    persist_dir: str = CHROMA_PERSIST_DIR,
+    batch_size: int = INGEST_BATCH_SIZE,
+    workers: Optional[int] = None,
+) -> tuple[Chroma, dict]:
+    """Parse, split, embed and index every manual under ``manuals_dir``.
+
+    Files are split in a process pool and their chunks streamed to the vector
+    store in batches of ``batch_size``, so memory stays bounded regardless of
+    corpus size. A file is checkpointed once all of its chunks are indexed;
+    re-running resumes from the checkpoint. Chunk IDs are deterministic, so a
+    batch replayed after a crash is upserted rather than duplicated.
+
+    A file that cannot be read or split is logged, recorded under ``failed``
+    in the checkpoint and skipped, so one bad manual cannot block the rest.
+    Failed files are retried on the next run.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    checkpoint = _read_checkpoint(persist_dir)
+    done: set[str] = set(checkpoint["done"])
+    # Mark the index incomplete before anything is written to it, so a run
+    # that dies before its first flush is resumed rather than loaded as-is.
+    _write_checkpoint(persist_dir, done, complete=False)
+    store = Chroma(persist_directory=persist_dir, embedding_function=embeddings)
+    manual_files = sorted(str(p) for p in Path(manuals_dir).glob("**/*.md"))
+    pending = [f for f in manual_files if Path(f).relative_to(manuals_dir).as_posix() not in done]
+    print(f"Found {len(manual_files)} manual files ({len(done)} already indexed).")
+
+    workers = workers or os.cpu_count() or 1
+    batch: list[Document] = []
+    batch_ids: list[str] = []
+    # Files whose every chunk is either indexed or in the unflushed batch
+    ready: set[str] = set()
+    failed: dict[str, str] = {}
+    stats = {"files": 0, "chunks": 0, "batches": 0, "failed": 0}
+
+    def flush():
+        if batch:
+            store.add_documents(batch, ids=batch_ids)
+            stats["batches"] += 1
+            batch.clear()
+            batch_ids.clear()
+        done.update(ready)
+        ready.clear()
+        _write_checkpoint(persist_dir, done, complete=False, failed=failed)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep only a bounded number of files in flight so parsed chunks
+        # never pile up faster than the embedder can consume them.
+        in_flight: deque = deque()
+        files = iter(pending)
+        for filepath in files:
+            in_flight.append((filepath, pool.submit(_split_manual, filepath)))
+            if len(in_flight) >= workers * 4:
+                break
+        while in_flight:
+            filepath, future = in_flight.popleft()
+            next_file = next(files, None)
+            if next_file is not None:
+                in_flight.append((next_file, pool.submit(_split_manual, next_file)))
+
+            name = Path(filepath).relative_to(manuals_dir).as_posix()
+            try:
+                _, documents = future.result()
+            except BrokenProcessPool:
+                raise  # a dead worker is not this file's fault; resume later
+            except Exception as e:
+                print(f"Skipping manual {name}: {type(e).__name__}: {e}")
+                failed[name] = f"{type(e).__name__}: {e}"
+                stats["failed"] += 1
+                continue
+            for i, doc in enumerate(documents):
+                batch.append(doc)
+                batch_ids.append(f"{name}:{i}")
+                if len(batch) >= batch_size:
+                    flush()
+            # Only checkpointed once the flush holding its last chunk lands;
+            # a file cut off mid-way is re-split and upserted on resume.
+            ready.add(name)
+            stats["files"] += 1
+            stats["chunks"] += len(documents)
+
+    flush()
+    _write_checkpoint(persist_dir, done, complete=True, failed=failed)
+    print(f"Indexed {stats['chunks']} chunks from {stats['files']} manuals in {stats['batches']} batches.")
+    if failed:
+        print(f"{len(failed)} manual(s) failed and were skipped; see {INGEST_CHECKPOINT_FILE}.")
+    return store, stats
+
+
 def init_rag():
     global vector_store, llm
     print("Initializing RAG Pipeline...")
@@ -224,68 +909,17 @@ def init_rag():
 
     embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
 
-    if os.path.exists(CHROMA_PERSIST_DIR):
+    # A DB built before checkpointing existed has no checkpoint file and is
+    # treated as complete; an interrupted ingestion is resumed.
+    checkpoint_path = Path(CHROMA_PERSIST_DIR) / INGEST_CHECKPOINT_FILE
+    if os.path.exists(CHROMA_PERSIST_DIR) and (
+        not checkpoint_path.exists() or _read_checkpoint(CHROMA_PERSIST_DIR)["complete"]
+    ):
         print("Loading existing Chroma DB...")
         vector_store = Chroma(persist_directory=CHROMA_PERSIST_DIR, embedding_function=embeddings)
     else:
-        print(f"Creating new Chroma DB in {CHROMA_PERSIST_DIR}...")
-        # ── Fix 3: Markdown-aware splitting ──
-        # First split by markdown headers to keep sections intact,
-        # then sub-split any oversized sections with character-based splitter.
-        md_header_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=[
-                ("#", "manual_title"),
-                ("##", "doc_type"),
-                ("###", "section"),
-            ],
-            strip_headers=False,  # keep headers in the chunk text for context
-        )
-        # Sub-splitter for sections that exceed the chunk size
-        sub_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,     # larger chunks to keep procedures intact
-            chunk_overlap=200,
-        )
-
-        all_documents: list[Document] = []
-        manual_files = list(Path(MANUALS_DIR).glob("**/*.md"))
-        print(f"Found {len(manual_files)} manual files.")
-
-        for filepath in manual_files:
-            raw_text = filepath.read_text(encoding="utf-8")
-
-            # ── Fix 2: Parse metadata from filename ──
-            file_meta = _parse_manual_metadata(str(filepath))
-
-            # Split by headers first
-            header_chunks = md_header_splitter.split_text(raw_text)
-
-            for chunk in header_chunks:
-                # Merge file-level metadata with header metadata
-                merged_meta = {**file_meta, **chunk.metadata}
-                # Also store the source filename for Fix 4
-                merged_meta["source"] = filepath.name
-
-                # Sub-split if the chunk is too large
-                if len(chunk.page_content) > 1500:
-                    sub_chunks = sub_splitter.split_text(chunk.page_content)
-                    for sc in sub_chunks:
-                        all_documents.append(Document(
-                            page_content=sc,
-                            metadata=merged_meta,
-                        ))
-                else:
-                    all_documents.append(Document(
-                        page_content=chunk.page_content,
-                        metadata=merged_meta,
-                    ))
-
-        print(f"Created {len(all_documents)} chunks from {len(manual_files)} manuals.")
-
-        vector_store = Chroma.from_documents(
-            documents=all_documents,
-            embedding=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR,
-        )
+        print(f"Building Chroma DB in {CHROMA_PERSIST_DIR}...")
+        vector_store, _ = ingest_manuals(embeddings)
 
     # ── Fix 6: ChromaDB is now persisted to CHROMA_PERSIST_DIR ──
     # On subsequent startups it loads from disk without re-embedding.
@@ -296,16 +930,605 @@ def init_rag():
     print("RAG Pipeline initialized and ready!")
 
 
+# ──────────────────────────────────────────────
+# LLM Scheduler
+# ──────────────────────────────────────────────
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_PER_TECHNICIAN = int(os.getenv("LLM_MAX_PER_TECHNICIAN", "2"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+LLM_TECHNICIAN_TOKENS_PER_MINUTE = int(os.getenv("LLM_TECHNICIAN_TOKENS_PER_MINUTE", "100000"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "30"))
+
+# Fraction of LLM_MAX_QUEUE each urgency class may fill before it is shed,
+# so low-urgency work is turned away well before critical work.
+LLM_QUEUE_SHARE = {"critical": 1.0, "high": 1.0, "medium": 0.75, "low": 0.5}
+
+# Rough prompt-size heuristic (chars per token) plus a fixed output allowance
+_CHARS_PER_TOKEN = 4
+_OUTPUT_TOKEN_ALLOWANCE = 1024
+# Slots are taken before retrieval, so the prompt is estimated up front:
+# k=6 manual chunks of up to 1500 chars plus ticket, telemetry and history
+_RAG_CONTEXT_TOKEN_ALLOWANCE = 3000
+
+
+def _estimate_tokens(*texts: str) -> int:
+    return sum(len(t) for t in texts) // _CHARS_PER_TOKEN + _OUTPUT_TOKEN_ALLOWANCE
+
+
+class LLMOverloaded(Exception):
+    """Raised when a request is shed; carries a Retry-After hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    """Token-rate budget refilled continuously at ``per_minute`` tokens/minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: int, now: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if available now).
+        Requests bigger than the whole bucket only wait for a full bucket."""
+        self._refill(now)
+        needed = min(float(amount), self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def consume(self, amount: int):
+        # May go negative when actual usage exceeds the estimate; the debt is
+        # paid back before the next request is admitted.
+        self.tokens -= amount
+
+
+class _QueuedCall:
+    __slots__ = ("key", "urgency", "technician", "tokens", "enqueued", "started", "future")
+
+    def __init__(self, key: tuple, urgency: str, technician: Optional[str], tokens: int, future: asyncio.Future):
+        self.key = key
+        self.urgency = urgency
+        self.technician = technician
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.started: Optional[float] = None
+        self.future = future  # resolved when granted, or failed with LLMOverloaded
+
+    def __lt__(self, other: "_QueuedCall") -> bool:
+        return self.key < other.key
+
+
+class LLMScheduler:
+    """Priority scheduler with admission control for all LLM calls.
+
+    Waiting calls are ordered by ticket urgency (``URGENCY_ORDER``), then by
+    ``time_to_failure_hours``, then arrival. Calls are dispatched in that
+    order whenever a technician is under their concurrency cap and both the
+    global and per-technician token buckets can cover the estimate. When the
+    queue is full, the lowest-priority waiter is shed (or the new call, if it
+    ranks lower) with an ``LLMOverloaded`` carrying Retry-After.
+
+    The scheduler lives on the event loop and waiters are plain futures, so a
+    queued request holds no threadpool thread and shedding is decided the
+    moment a request arrives, independent of threadpool size. All methods
+    must be called from the event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_per_technician: int = LLM_MAX_PER_TECHNICIAN,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        technician_tokens_per_minute: int = LLM_TECHNICIAN_TOKENS_PER_MINUTE,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout_s: float = LLM_QUEUE_TIMEOUT_S,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_technician = max_per_technician
+        self.technician_tokens_per_minute = technician_tokens_per_minute
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+
+        self._queue: list[_QueuedCall] = []  # kept sorted, best first
+        self._seq = 0
+        self._running = 0
+        self._running_by_tech: dict[str, int] = {}
+        self._bucket = _TokenBucket(tokens_per_minute)
+        self._tech_buckets: dict[str, _TokenBucket] = {}
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+        self._service_times: deque = deque(maxlen=256)
+        self._metrics = {
+            u: {"running": 0, "admitted": 0, "shed": 0, "waits": deque(maxlen=1024)}
+            for u in URGENCY_ORDER
+        }
+
+    # ── admission ──
+
+    def _retry_after(self) -> int:
+        mean_service = (
+            sum(self._service_times) / len(self._service_times) if self._service_times else 5.0
+        )
+        backlog = (len(self._queue) + self._running) / max(self.max_concurrency, 1)
+        return max(1, int(backlog * mean_service + 0.5))
+
+    def _shed(self, call: _QueuedCall, reason: str):
+        self._metrics[call.urgency]["shed"] += 1
+        if not call.future.done():
+            call.future.set_exception(LLMOverloaded(reason, self._retry_after()))
+
+    def _admit(self, call: _QueuedCall):
+        share = LLM_QUEUE_SHARE.get(call.urgency, 0.5)
+        if len(self._queue) >= int(self.max_queue * share) and len(self._queue) < self.max_queue:
+            # Class-specific limit reached but room remains for higher urgencies
+            self._shed(call, f"LLM queue is too deep for {call.urgency} urgency work")
+            return
+        if len(self._queue) >= self.max_queue:
+            worst = self._queue[-1]
+            if not call < worst:
+                self._shed(call, "LLM queue is full")
+                return
+            self._queue.pop()
+            self._shed(worst, "Displaced by higher-urgency work")
+        bisect.insort(self._queue, call)
+
+    # ── dispatch ──
+
+    def _tech_bucket(self, technician: str) -> _TokenBucket:
+        bucket = self._tech_buckets.get(technician)
+        if bucket is None:
+            bucket = self._tech_buckets[technician] = _TokenBucket(self.technician_tokens_per_minute)
+        return bucket
+
+    def _dispatch(self):
+        """Start queued calls in priority order while the budgets allow.
+
+        Per-technician caps and buckets only apply to calls that carry a
+        technician identity.
+        """
+        if self._refill_timer is not None:
+            self._refill_timer.cancel()
+            self._refill_timer = None
+        i = 0
+        while i < len(self._queue) and self._running < self.max_concurrency:
+            call = self._queue[i]
+            tech = call.technician
+            if tech is not None and self._running_by_tech.get(tech, 0) >= self.max_per_technician:
+                i += 1  # a saturated technician must not block everyone else
+                continue
+            now = time.monotonic()
+            wait = self._bucket.wait_time(call.tokens, now)
+            if tech is not None:
+                wait = max(wait, self._tech_bucket(tech).wait_time(call.tokens, now))
+            if wait > 0:
+                # Lower-priority calls don't jump a call waiting on tokens;
+                # look again once the buckets have refilled.
+                self._refill_timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            self._queue.pop(i)
+            self._start(call, now)
+
+    def _start(self, call: _QueuedCall, now: float):
+        self._running += 1
+        self._bucket.consume(call.tokens)
+        if call.technician is not None:
+            self._running_by_tech[call.technician] = self._running_by_tech.get(call.technician, 0) + 1
+            self._tech_bucket(call.technician).consume(call.tokens)
+        metrics = self._metrics[call.urgency]
+        metrics["running"] += 1
+        metrics["admitted"] += 1
+        metrics["waits"].append(now - call.enqueued)
+        call.started = now
+        call.future.set_result(None)
+
+    async def acquire(
+        self, urgency: str, time_to_failure_hours: float, technician: Optional[str], tokens: int,
+    ) -> _QueuedCall:
+        urgency = urgency if urgency in URGENCY_ORDER else "low"
+        self._seq += 1
+        call = _QueuedCall(
+            (URGENCY_ORDER[urgency], time_to_failure_hours, self._seq),
+            urgency, technician, tokens, asyncio.get_running_loop().create_future(),
+        )
+        self._admit(call)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(call.future), self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            # A release in the same loop turn may have started the call just
+            # as the wait expired; then it holds a slot and goes ahead.
+            if call.started is None:
+                if call in self._queue:
+                    self._queue.remove(call)
+                self._shed(call, "Timed out waiting for an LLM slot")
+                self._dispatch()
+                call.future.result()  # raises the LLMOverloaded set by _shed
+        except asyncio.CancelledError:
+            # Client went away: give back the slot, or leave the queue
+            if call.started is not None:
+                self.release(call)
+            elif call in self._queue:
+                self._queue.remove(call)
+                self._dispatch()
+            raise
+        return call
+
+    def release(self, call: _QueuedCall, actual_tokens: Optional[int] = None):
+        self._running -= 1
+        if call.technician is not None:
+            remaining = self._running_by_tech[call.technician] - 1
+            if remaining:
+                self._running_by_tech[call.technician] = remaining
+            else:
+                del self._running_by_tech[call.technician]
+        self._metrics[call.urgency]["running"] -= 1
+        self._service_times.append(time.monotonic() - call.started)
+        if actual_tokens is not None:
+            # Reconcile the estimate with what the model actually billed
+            self._bucket.consume(actual_tokens - call.tokens)
+            if call.technician is not None:
+                self._tech_bucket(call.technician).consume(actual_tokens - call.tokens)
+        self._dispatch()
+
+    async def run(self, ticket: dict, technician: Optional[str], tokens: int, fn, /, *args):
+        """Wait for an LLM slot for ``ticket``, then run ``fn`` in the threadpool.
+
+        ``fn`` is called as ``fn(*args, usage=usage)``; it sets
+        ``usage["tokens"]`` to the billed total to reconcile the token budget.
+        The slot is released when ``fn`` returns, not when the request ends:
+        if the client disconnects, the worker thread keeps calling the model
+        and must keep counting against the caps. Raises HTTP 429 with
+        Retry-After when shed.
+        """
+        try:
+            call = await self.acquire(
+                ticket.get("urgency", "low"),
+                ticket.get("prediction_details", {}).get("time_to_failure_hours", float("inf")),
+                technician,
+                tokens,
+            )
+        except LLMOverloaded as e:
+            raise HTTPException(
+                status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+            )
+        usage: dict = {"tokens": None}
+        work = asyncio.ensure_future(run_in_threadpool(fn, *args, usage=usage))
+
+        def finished(task: asyncio.Future):
+            if not task.cancelled():
+                task.exception()  # retrieved here in case the caller went away
+            self.release(call, usage["tokens"])
+
+        work.add_done_callback(finished)
+        return await asyncio.shield(work)
+
+    def snapshot(self) -> dict:
+        """Queue depth and wait-time metrics per urgency class."""
+        depth = {u: 0 for u in URGENCY_ORDER}
+        for call in self._queue:
+            depth[call.urgency] += 1
+        classes = {}
+        for urgency, m in self._metrics.items():
+            waits = sorted(m["waits"])
+            classes[urgency] = {
+                "queued": depth[urgency],
+                "running": m["running"],
+                "admitted": m["admitted"],
+                "shed": m["shed"],
+                "wait_ms": {
+                    "p50": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    "p95": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None,
+                    "max": round(waits[-1] * 1000, 1) if waits else None,
+                },
+            }
+        return {
+            "running": self._running,
+            "queued": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "tokens_available": int(self._bucket.tokens),
+            "classes": classes,
+        }
+
+
+def _usage_tokens(response) -> Optional[int]:
+    """Total tokens billed for an LLM response, if the provider reported it."""
+    usage = getattr(response, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+llm_scheduler = LLMScheduler()
+
+
+# ──────────────────────────────────────────────
+# Request Profiling
+# ──────────────────────────────────────────────
+
+PROFILE_BUFFER_SIZE = 200       # sampled requests kept in the ring buffer
+PROFILE_ADMIN_PATH = "/api/admin/profiling"
+_PROFILE_MAX_FUNCS = 200        # per-sample cap on stored functions / stacks
+_PROFILE_MAX_DEPTH = 64
+
+
+class RequestProfiler:
+    """Runtime-switchable, sampled cProfile/tracemalloc profiler for routes.
+
+    When disabled the per-request cost is a single attribute check. When
+    enabled, each request is sampled with its route's rate (falling back to
+    ``sample_rate``). Only one request is profiled at a time, since cProfile
+    and tracemalloc are effectively process-wide; requests arriving while
+    another is being profiled are simply not sampled.
+    """
+
+    def __init__(self, buffer_size: int = PROFILE_BUFFER_SIZE):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.route_rates: dict[str, float] = {}
+        self.memory = False
+        self.samples: deque = deque(maxlen=buffer_size)
+        self._busy = threading.Lock()
+
+    def configure(self, enabled: bool, sample_rate: float, route_rates: dict[str, float], memory: bool):
+        self.sample_rate = sample_rate
+        self.route_rates = dict(route_rates)
+        self.memory = memory
+        self.enabled = enabled
+
+    def should_sample(self, route: str) -> bool:
+        return random.random() < self.route_rates.get(route, self.sample_rate)
+
+    def run(self, route: str, fn, /, *args, **kwargs):
+        """Call ``fn`` under the profiler if this request is sampled."""
+        if not self.should_sample(route) or not self._busy.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            memory = self.memory
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            # Trace allocations only around the endpoint call itself
+            if memory:
+                tracemalloc.start()
+            profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                duration = time.perf_counter() - start
+                allocations, peak = None, None
+                if memory:
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    allocations = [
+                        {"site": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                        for stat in snapshot.statistics("lineno")
+                        if not _is_profiler_frame(stat.traceback[0])
+                    ][:_PROFILE_MAX_FUNCS]
+                self.samples.append(
+                    _profile_sample(route, duration, profiler, allocations, peak)
+                )
+        finally:
+            self._busy.release()
+
+    def report(self, route: Optional[str] = None, top: int = 25) -> dict:
+        """Aggregate buffered samples into top functions and allocation sites."""
+        samples = [s for s in list(self.samples) if route is None or s["route"] == route]
+        functions: dict[str, list] = {}
+        allocations: dict[str, list] = {}
+        per_route: dict[str, list[float]] = {}
+        for sample in samples:
+            per_route.setdefault(sample["route"], []).append(sample["duration_ms"])
+            for name, (calls, tottime, cumtime) in sample["functions"].items():
+                agg = functions.setdefault(name, [0, 0.0, 0.0])
+                agg[0] += calls
+                agg[1] += tottime
+                agg[2] += cumtime
+            for alloc in sample["allocations"] or []:
+                agg = allocations.setdefault(alloc["site"], [0, 0])
+                agg[0] += alloc["size_bytes"]
+                agg[1] += alloc["count"]
+
+        top_functions = sorted(functions.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        top_allocations = sorted(allocations.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "route_rates": self.route_rates,
+            "memory": self.memory,
+            "samples": len(samples),
+            "routes": {
+                r: {"samples": len(d), "mean_ms": round(sum(d) / len(d), 2), "max_ms": round(max(d), 2)}
+                for r, d in per_route.items()
+            },
+            "top_functions": [
+                {
+                    "function": name,
+                    "calls": calls,
+                    "tottime_ms": round(tottime * 1000, 3),
+                    "cumtime_ms": round(cumtime * 1000, 3),
+                }
+                for name, (calls, tottime, cumtime) in top_functions
+            ],
+            "top_allocations": [
+                {"site": site, "size_bytes": size, "count": count}
+                for site, (size, count) in top_allocations
+            ],
+        }
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Buffered samples in collapsed-stack format (``a;b;c <microseconds>``),
+        ready for flamegraph.pl or speedscope."""
+        stacks: dict[str, int] = {}
+        for sample in list(self.samples):
+            if route is None or sample["route"] == route:
+                for stack, weight in sample["stacks"].items():
+                    stacks[stack] = stacks.get(stack, 0) + weight
+        return "\n".join(f"{stack} {weight}" for stack, weight in sorted(stacks.items())) + "\n"
+
+
+def _code_lines(code) -> range:
+    lines = [line for _, _, line in code.co_lines() if line is not None]
+    return range(min(lines), max(lines) + 1)
+
+
+# Allocations made by the profiler's own bookkeeping rather than the endpoint
+_PROFILER_OWN_LINES = _code_lines(RequestProfiler.run.__code__)
+
+
+def _is_profiler_frame(frame: tracemalloc.Frame) -> bool:
+    if frame.filename == __file__:
+        return frame.lineno in _PROFILER_OWN_LINES
+    return frame.filename in (tracemalloc.__file__, cProfile.__file__)
+
+
+def _profile_func_name(func: tuple) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name  # built-ins, e.g. <built-in method time.sleep>
+    return f"{Path(filename).name}:{lineno}({name})"
+
+
+def _profile_sample(route: str, duration: float, profiler: cProfile.Profile, allocations, peak) -> dict:
+    """Reduce a finished cProfile run to a compact, JSON-friendly sample."""
+    stats = pstats.Stats(profiler).stats  # func -> (cc, nc, tt, ct, callers)
+
+    functions = {
+        _profile_func_name(func): (nc, tt, ct)
+        for func, (cc, nc, tt, ct, callers) in sorted(
+            stats.items(), key=lambda kv: kv[1][2], reverse=True
+        )[:_PROFILE_MAX_FUNCS]
+    }
+
+    # cProfile only records caller -> callee edges, so stacks are rebuilt by
+    # walking down from the roots and splitting each function's time across
+    # the callers in proportion to the time spent under each edge.
+    children: dict[tuple, list[tuple]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [f for f, (_, _, _, _, callers) in stats.items() if not callers]
+
+    stacks: dict[str, int] = {}
+    budget = [_PROFILE_MAX_FUNCS * 50]  # bound on nodes visited per sample
+
+    def walk(func: tuple, path: list[str], share: float, seen: set):
+        budget[0] -= 1
+        tt = stats[func][2]
+        frame_path = path + [_profile_func_name(func)]
+        weight = int(tt * share * 1_000_000)
+        if weight:
+            key = ";".join(frame_path)
+            stacks[key] = stacks.get(key, 0) + weight
+        if len(frame_path) >= _PROFILE_MAX_DEPTH:
+            return
+        for child, edge_ct in children.get(func, []):
+            child_ct = stats[child][3]
+            # Skip recursion and sub-microsecond branches
+            if child in seen or not child_ct or share * edge_ct < 1e-6 or budget[0] <= 0:
+                continue
+            walk(child, frame_path, share * edge_ct / child_ct, seen | {child})
+
+    for root in roots:
+        walk(root, [route], 1.0, {root})
+
+    top_stacks = dict(sorted(stacks.items(), key=lambda kv: kv[1], reverse=True)[:_PROFILE_MAX_FUNCS])
+    return {
+        "route": route,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": duration * 1000,
+        "functions": functions,
+        "stacks": top_stacks,
+        "allocations": allocations,
+        "peak_traced_bytes": peak,
+    }
+
+
+request_profiler = RequestProfiler()
+
+
+def _profiled(route: str, fn, /, *args, **kwargs):
+    """Call ``fn`` under ``request_profiler`` when profiling is enabled.
+
+    Async endpoints use this for the sync work they hand to the threadpool,
+    since ProfiledRoute only wraps sync endpoints.
+    """
+    if not request_profiler.enabled:
+        return fn(*args, **kwargs)
+    return request_profiler.run(route, fn, *args, **kwargs)
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that runs its endpoint under ``request_profiler`` when enabled.
+
+    The endpoint is wrapped before FastAPI inspects it (``functools.wraps``
+    keeps the signature), so sync endpoints are profiled in the threadpool
+    thread that actually executes them. Async endpoints and the profiling
+    admin routes are left unwrapped.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # The profiling admin routes are never sampled, so reading a report
+        # does not add its own frames to the report.
+        if not asyncio.iscoroutinefunction(endpoint) and not path.startswith(PROFILE_ADMIN_PATH):
+            original = endpoint
+
+            @wraps(original)
+            def endpoint(*args, **kw):
+                return _profiled(path, original, *args, **kw)
+        super().__init__(path, endpoint, **kwargs)
+
+
 # ──────────────────────────────────────────────
 # App Lifespan
 # ──────────────────────────────────────────────
 
+def _watch_alerts_file(stop: threading.Event, path: str = ALERTS_FILE):
+    """Reload alerts whenever the file's mtime or size changes.
+
+    Upstream writers should replace the file atomically (write + rename).
+    A half-written JSON array or an empty file is rejected and retried on the
+    next change, but NDJSON cut off exactly at a line boundary still parses,
+    so only the rename makes that case safe.
+    """
+    def signature():
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    last = signature()
+    while not stop.wait(ALERTS_WATCH_INTERVAL_S):
+        current = signature()
+        if current is None or current == last:
+            continue
+        last = current
+        try:
+            _load_alerts(path)
+        except Exception as e:
+            print(f"WARNING: Alert reload from {path} failed, keeping previous alerts: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_rag()
+    stop = threading.Event()
+    if ALERTS_WATCH_INTERVAL_S > 0:
+        threading.Thread(target=_watch_alerts_file, args=(stop,), daemon=True).start()
     yield
+    stop.set()
 
 app = FastAPI(title="fixity API", lifespan=lifespan)
+# Every route below is registered through ProfiledRoute so it can be sampled
+app.router.route_class = ProfiledRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -378,24 +1601,58 @@ def update_ticket_status(ticket_id: str, request: TicketStatusUpdateRequest):
             detail=f"Invalid status '{request.status}'. Must be one of: {', '.join(VALID_STATUSES)}"
         )
 
-    ticket_states[ticket_id] = request.status
+    with ticket_locks.lock(ticket_id):
+        if ticket_id not in alerts_by_id:
+            raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+        ticket_states[ticket_id] = request.status
     return _enrich_ticket(ticket)
 
 
 # ---------- Checklists ----------
 
+def _copy_checklist(checklist: list[dict]) -> list[dict]:
+    """Snapshot a checklist so it can be serialized outside the ticket lock."""
+    return [dict(item) for item in checklist]
+
+
+def _set_checklist_items(ticket_id: str, indices: list[int], completed: bool, notes: Optional[str] = None) -> bool:
+    """Update checklist items and the ticket status they imply, atomically.
+
+    If all items become completed, the ticket is auto-set to 'completed'; if
+    an item is unchecked after auto-completion, it reverts to 'in_progress'.
+    Out-of-range indices are ignored. Returns whether all items are completed.
+    """
+    with ticket_locks.lock(ticket_id):
+        checklist = ticket_checklists[ticket_id]
+        for idx in indices:
+            if 0 <= idx < len(checklist):
+                checklist[idx]["completed"] = completed
+                if notes is not None:
+                    checklist[idx]["notes"] = notes
+
+        all_completed = all(item["completed"] for item in checklist)
+        if all_completed:
+            ticket_states[ticket_id] = "completed"
+        elif ticket_states.get(ticket_id) == "completed":
+            ticket_states[ticket_id] = "in_progress"
+        return all_completed
+
+
 @app.get("/api/tickets/{ticket_id}/checklist")
-def get_ticket_checklist(ticket_id: str):
+async def get_ticket_checklist(
+    ticket_id: str,
+    x_technician_id: Optional[str] = Header(None),
+):
     """
     Returns the repair checklist for a ticket.
     Generated via RAG on first call, then cached in memory for subsequent calls.
+    Generation waits for an LLM slot on the event loop, then runs in the threadpool.
     """
-    # Return cached checklist if it exists
-    if ticket_id in ticket_checklists:
-        return {
-            "ticket_id": ticket_id,
-            "checklist": ticket_checklists[ticket_id],
-        }
+    # Return cached checklist if it exists. The ticket lock is a thread lock
+    # that a reload or reset may hold for a while, so never take it on the loop.
+    cached = await run_in_threadpool(_cached_checklist, ticket_id)
+    if cached is not None:
+        return cached
 
     # Generate new checklist via RAG
     if not vector_store or not llm:
@@ -408,6 +1665,26 @@ def get_ticket_checklist(ticket_id: str):
     if not ticket:
         raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
 
+    est_tokens = _estimate_tokens(ticket["prediction_details"]["telemetry_context"]) + _RAG_CONTEXT_TOKEN_ALLOWANCE
+    return await llm_scheduler.run(
+        ticket, x_technician_id or None, est_tokens,
+        _profiled, "/api/tickets/{ticket_id}/checklist", _generate_checklist, ticket_id, ticket,
+    )
+
+
+def _cached_checklist(ticket_id: str) -> Optional[dict]:
+    """Return the cached checklist response for a ticket, if one exists."""
+    with ticket_locks.lock(ticket_id):
+        if ticket_id in ticket_checklists:
+            return {
+                "ticket_id": ticket_id,
+                "checklist": _copy_checklist(ticket_checklists[ticket_id]),
+            }
+    return None
+
+
+def _generate_checklist(ticket_id: str, ticket: dict, usage: dict) -> dict:
+    """Retrieve manual context, ask the LLM for a checklist and cache it."""
     try:
         model = ticket["station_info"]["model"]
         charger_type = ticket["station_info"]["charger_type"]
@@ -452,6 +1729,7 @@ def get_ticket_checklist(ticket_id: str):
             "error_code": error_code,
             "telemetry_context": context,
         })
+        usage["tokens"] = _usage_tokens(response)
 
         # Parse the response into checklist items
         raw_steps = response.content.split('\n')
@@ -471,17 +1749,22 @@ def get_ticket_checklist(ticket_id: str):
                 if step.strip()
             ]
 
-        # Cache the checklist
-        ticket_checklists[ticket_id] = checklist
-
-        # Auto-set ticket status to in_progress when checklist is first generated
-        if ticket_states.get(ticket_id) not in ("in_progress", "completed"):
-            ticket_states[ticket_id] = "in_progress"
-
-        return {
-            "ticket_id": ticket_id,
-            "checklist": checklist,
-        }
+        # Cache the checklist. The LLM call runs unlocked, so a concurrent
+        # request may have cached one first (keep that one) or a reload may
+        # have removed the ticket.
+        with ticket_locks.lock(ticket_id):
+            if ticket_id not in alerts_by_id:
+                raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+            checklist = ticket_checklists.setdefault(ticket_id, checklist)
+
+            # Auto-set ticket status to in_progress when checklist is first generated
+            if ticket_states.get(ticket_id) not in ("in_progress", "completed"):
+                ticket_states[ticket_id] = "in_progress"
+
+            return {
+                "ticket_id": ticket_id,
+                "checklist": _copy_checklist(checklist),
+            }
     except HTTPException:
         raise
     except Exception as e:
@@ -494,46 +1777,40 @@ def update_checklist_item(ticket_id: str, item_index: int, request: ChecklistUpd
     Update a checklist item's completion status and optional notes.
     If all items become completed, the ticket status is auto-set to 'completed'.
     """
-    if ticket_id not in ticket_checklists:
-        raise HTTPException(
-            status_code=404,
-            detail=f"No checklist found for ticket {ticket_id}. Generate one first via GET."
-        )
-
-    checklist = ticket_checklists[ticket_id]
+    with ticket_locks.lock(ticket_id):
+        if ticket_id not in ticket_checklists:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No checklist found for ticket {ticket_id}. Generate one first via GET."
+            )
 
-    if item_index < 0 or item_index >= len(checklist):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Item index {item_index} is out of range. Checklist has {len(checklist)} items (0-{len(checklist) - 1})."
-        )
+        checklist = ticket_checklists[ticket_id]
 
-    checklist[item_index]["completed"] = request.completed
-    if request.notes is not None:
-        checklist[item_index]["notes"] = request.notes
+        if item_index < 0 or item_index >= len(checklist):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Item index {item_index} is out of range. Checklist has {len(checklist)} items (0-{len(checklist) - 1})."
+            )
 
-    # Check if all items are now completed -> auto-complete the ticket
-    # If an item is unchecked after auto-completion, revert to in_progress
-    all_completed = all(item["completed"] for item in checklist)
-    if all_completed:
-        ticket_states[ticket_id] = "completed"
-    elif ticket_states.get(ticket_id) == "completed":
-        ticket_states[ticket_id] = "in_progress"
+        all_completed = _set_checklist_items(ticket_id, [item_index], request.completed, request.notes)
 
-    return {
-        "ticket_id": ticket_id,
-        "item_index": item_index,
-        "item": checklist[item_index],
-        "all_completed": all_completed,
-        "ticket_status": ticket_states.get(ticket_id, "unknown"),
-        "checklist": checklist,
-    }
+        return {
+            "ticket_id": ticket_id,
+            "item_index": item_index,
+            "item": dict(checklist[item_index]),
+            "all_completed": all_completed,
+            "ticket_status": ticket_states.get(ticket_id, "unknown"),
+            "checklist": _copy_checklist(checklist),
+        }
 
 
 # ---------- AI Chat ----------
 
 @app.post("/api/chat")
-def chat_with_copilot(request: ChatRequest):
+async def chat_with_copilot(
+    request: ChatRequest,
+    x_technician_id: Optional[str] = Header(None),
+):
     """
     Answers a technician's question using the RAG manuals.
     Maintains per-ticket conversation history for multi-turn support.
@@ -546,6 +1823,9 @@ def chat_with_copilot(request: ChatRequest):
     - Fix 3: Uses markdown-aware chunks with k=6
     - Fix 4: Source document references included in response
     - Fix 5: Telemetry trend analysis injected into prompt context
+
+    The request waits for an LLM slot on the event loop (or is shed with a
+    429), then retrieval and generation run in the threadpool.
     """
     if not vector_store or not llm:
         raise HTTPException(
@@ -553,17 +1833,30 @@ def chat_with_copilot(request: ChatRequest):
             detail="RAG Pipeline not initialized (Check GOOGLE_API_KEY)"
         )
 
-    try:
-        # Validate that the ticket exists
-        ticket = _get_ticket_by_id(request.ticket_id)
-        if not ticket:
-            raise HTTPException(status_code=404, detail=f"Ticket {request.ticket_id} not found")
+    # Validate that the ticket exists
+    ticket = _get_ticket_by_id(request.ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail=f"Ticket {request.ticket_id} not found")
+
+    # Images are billed at a roughly fixed token cost by Gemini
+    est_tokens = (
+        _estimate_tokens(request.message) + _RAG_CONTEXT_TOKEN_ALLOWANCE
+        + (258 if request.image_base64 else 0)
+    )
+    return await llm_scheduler.run(
+        ticket, x_technician_id or None, est_tokens, _profiled, "/api/chat", _answer_chat, request, ticket,
+    )
 
-        # Initialize chat history for this ticket if needed
-        if request.ticket_id not in chat_histories:
-            chat_histories[request.ticket_id] = []
 
-        history = chat_histories[request.ticket_id]
+def _answer_chat(request: ChatRequest, ticket: dict, usage: dict) -> ChatResponse:
+    """Retrieve, prompt the LLM and record the turn for one chat request."""
+    try:
+        # Snapshot the checklist and recent history; the LLM call below runs
+        # without holding the ticket lock.
+        with ticket_locks.lock(request.ticket_id):
+            checklist = ticket_checklists.get(request.ticket_id)
+            checklist = _copy_checklist(checklist) if checklist is not None else None
+            recent_history = list(chat_histories.get(request.ticket_id, [])[-10:])
 
         # ── Fix 1: Build a clean retrieval query ──
         # Use only the user's message + current step task (if any) for retrieval.
@@ -571,9 +1864,9 @@ def chat_with_copilot(request: ChatRequest):
         # the semantic search.
         retrieval_query = request.message
         if (request.step_idx is not None and
-                request.ticket_id in ticket_checklists and
-                0 <= request.step_idx < len(ticket_checklists[request.ticket_id])):
-            step_task = ticket_checklists[request.ticket_id][request.step_idx]["task"]
+                checklist is not None and
+                0 <= request.step_idx < len(checklist)):
+            step_task = checklist[request.step_idx]["task"]
             retrieval_query = f"{step_task}: {request.message}"
 
         # ── Fix 2: Metadata-filtered retrieval ──
@@ -620,8 +1913,7 @@ def chat_with_copilot(request: ChatRequest):
 
         # Checklist context
         checklist_context = ""
-        if request.ticket_id in ticket_checklists:
-            checklist = ticket_checklists[request.ticket_id]
+        if checklist is not None:
             checklist_overview = "\nRepair Checklist Overview:\n"
             for i, item in enumerate(checklist):
                 status = "DONE" if item["completed"] else "PENDING"
@@ -640,7 +1932,6 @@ def chat_with_copilot(request: ChatRequest):
 
         # Conversation history (last 10 messages)
         history_str = ""
-        recent_history = history[-10:]
         if recent_history:
             history_str = "\nConversation History:\n"
             for msg in recent_history:
@@ -649,7 +1940,7 @@ def chat_with_copilot(request: ChatRequest):
 
         # Step completion detection instruction
         step_completion_instruction = ""
-        if request.step_idx is not None and request.ticket_id in ticket_checklists:
+        if request.step_idx is not None and checklist is not None:
             step_completion_instruction = (
                 "\n\nIMPORTANT: If the technician's message indicates they have successfully completed "
                 "the current step (e.g., they say 'done', 'finished', 'completed', 'fixed it', "
@@ -693,43 +1984,50 @@ def chat_with_copilot(request: ChatRequest):
             human_msg = HumanMessage(content=request.message)
 
         response = llm.invoke([system_msg, human_msg])
+        usage["tokens"] = _usage_tokens(response)
 
         now = datetime.now(timezone.utc).isoformat()
         answer_text = response.content
 
-        # Parse and process [STEP_COMPLETE:N] markers
-        completed_steps: list[int] = []
+        # Parse [STEP_COMPLETE:N] markers
         step_complete_pattern = r'\[STEP_COMPLETE:(\d+)\]'
-        matches = re.findall(step_complete_pattern, answer_text)
-        for match in matches:
-            step_index = int(match)
-            if (request.ticket_id in ticket_checklists and
-                    0 <= step_index < len(ticket_checklists[request.ticket_id])):
-                ticket_checklists[request.ticket_id][step_index]["completed"] = True
-                completed_steps.append(step_index)
+        marked_steps = [int(match) for match in re.findall(step_complete_pattern, answer_text)]
 
         # Strip the markers from the displayed response
         clean_answer = re.sub(step_complete_pattern, '', answer_text).strip()
 
-        # Store both user message and assistant response in history
+        # Apply step completions and store both user message and assistant
+        # response in history as one atomic update
         step_idx_val = request.step_idx if request.step_idx is not None else None
-        history.append({
-            "role": "user",
-            "content": request.message,
-            "timestamp": now,
-            "checklist_item_index": step_idx_val,
-        })
-        history.append({
-            "role": "assistant",
-            "content": clean_answer,
-            "timestamp": now,
-            "checklist_item_index": step_idx_val,
-        })
+        with ticket_locks.lock(request.ticket_id):
+            if request.ticket_id not in alerts_by_id:
+                raise HTTPException(status_code=404, detail=f"Ticket {request.ticket_id} not found")
+            completed_steps: list[int] = []
+            if request.ticket_id in ticket_checklists:
+                checklist_len = len(ticket_checklists[request.ticket_id])
+                completed_steps = [i for i in marked_steps if 0 <= i < checklist_len]
+                if completed_steps:
+                    _set_checklist_items(request.ticket_id, completed_steps, True)
+
+            history = chat_histories.setdefault(request.ticket_id, [])
+            history.append({
+                "role": "user",
+                "content": request.message,
+                "timestamp": now,
+                "checklist_item_index": step_idx_val,
+            })
+            history.append({
+                "role": "assistant",
+                "content": clean_answer,
+                "timestamp": now,
+                "checklist_item_index": step_idx_val,
+            })
+            history_length = len(history)
 
         return ChatResponse(
             answer=clean_answer,
             ticket_id=request.ticket_id,
-            history_length=len(history),
+            history_length=history_length,
             completed_steps=completed_steps,
             sources=sources,
         )
@@ -746,7 +2044,8 @@ def get_chat_history(ticket_id: str):
     if not ticket:
         raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
 
-    history = chat_histories.get(ticket_id, [])
+    with ticket_locks.lock(ticket_id):
+        history = list(chat_histories.get(ticket_id, []))
     return {
         "ticket_id": ticket_id,
         "history": history,
@@ -754,8 +2053,82 @@ def get_chat_history(ticket_id: str):
     }
 
 
+# ---------- Fleet Telemetry ----------
+
+@app.get("/api/fleet/telemetry")
+def query_fleet_telemetry(
+    metric: str = Query(..., description="Telemetry metric, e.g. pump_rpm"),
+    stat: str = Query("last", description=f"One of: {', '.join(sorted(FLEET_STATS))}"),
+    op: Optional[str] = Query(None, description=f"Filter operator, one of: {', '.join(sorted(FLEET_OPS))}"),
+    value: Optional[float] = Query(None, description="Filter threshold used with op"),
+    window_hours: Optional[float] = Query(None, gt=0, description="Lookback window for change/change_pct"),
+    top_k: int = Query(50, ge=1, le=1000, description="Maximum number of chargers returned"),
+    order: str = Query("desc", description="Sort order of results: asc or desc"),
+):
+    """
+    Vectorized fleet-wide telemetry query across all chargers.
+    Examples:
+      - pump_rpm fell more than 10% in 24h:
+        ?metric=pump_rpm&stat=change_pct&window_hours=24&op=lt&value=-10
+      - top 50 by temperature slope (per hour):
+        ?metric=temperature_c&stat=slope&top_k=50
+    """
+    if fleet_telemetry is None:
+        raise HTTPException(status_code=500, detail="Fleet telemetry not loaded")
+    if metric not in fleet_telemetry.columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown metric '{metric}'. Must be one of: {', '.join(fleet_telemetry.metrics)}"
+        )
+    if stat not in FLEET_STATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid stat '{stat}'. Must be one of: {', '.join(sorted(FLEET_STATS))}"
+        )
+    if op is not None and op not in FLEET_OPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid op '{op}'. Must be one of: {', '.join(sorted(FLEET_OPS))}"
+        )
+    if (op is None) != (value is None):
+        raise HTTPException(status_code=400, detail="'op' and 'value' must be provided together")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Invalid order '{order}'. Must be asc or desc")
+    if window_hours is not None and stat not in ("change", "change_pct"):
+        raise HTTPException(status_code=400, detail="'window_hours' only applies to change and change_pct")
+
+    return fleet_telemetry.query(
+        metric, stat, op=op, value=value, top_k=top_k, order=order, window_hours=window_hours,
+    )
+
+
+@app.get("/api/fleet/telemetry/metrics")
+def list_fleet_metrics():
+    """Lists the telemetry metrics available for fleet queries."""
+    if fleet_telemetry is None:
+        raise HTTPException(status_code=500, detail="Fleet telemetry not loaded")
+    return {
+        "metrics": fleet_telemetry.metrics,
+        "chargers": len(fleet_telemetry.charger_ids),
+    }
+
+
+# ---------- LLM Scheduler ----------
+
+@app.get("/api/llm/scheduler")
+async def get_llm_scheduler_metrics():
+    """Returns LLM queue depth, admissions, shed counts and wait times per urgency class."""
+    return llm_scheduler.snapshot()
+
+
 # ---------- Admin / Demo ----------
 
+def _require_admin(key: str):
+    """Reject the request unless it carries the ADMIN_SECRET key."""
+    if key != ADMIN_SECRET:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+
+
 @app.post("/api/admin/reset")
 def reset_all_data(key: str = Query(..., description="Admin secret key")):
     """
@@ -763,16 +2136,16 @@ def reset_all_data(key: str = Query(..., description="Admin secret key")):
     back to defaults. Used to reset the demo between presentations.
     Requires the ADMIN_SECRET key as a query parameter.
     """
-    if key != ADMIN_SECRET:
-        raise HTTPException(status_code=403, detail="Invalid admin key")
+    _require_admin(key)
 
-    ticket_states.clear()
-    ticket_checklists.clear()
-    chat_histories.clear()
+    with ticket_locks.lock_all():
+        ticket_states.clear()
+        ticket_checklists.clear()
+        chat_histories.clear()
 
-    # Re-seed ticket statuses from original alert data
-    for alert in raw_alerts:
-        ticket_states[alert["ticket_id"]] = alert["status"]
+        # Re-seed ticket statuses from original alert data
+        for alert in raw_alerts:
+            ticket_states[alert["ticket_id"]] = alert["status"]
 
     return {
         "message": "All data reset successfully",
@@ -782,10 +2155,113 @@ def reset_all_data(key: str = Query(..., description="Admin secret key")):
     }
 
 
+@app.post("/api/admin/alerts/reload")
+def reload_alerts(
+    key: str = Query(..., description="Admin secret key"),
+    allow_empty: bool = Query(False, description="Apply an empty alerts file, removing every ticket"),
+):
+    """
+    Re-read the alerts file (JSON array or NDJSON) and apply the differences
+    without a restart. Statuses, checklists and chat histories of surviving
+    tickets are kept; removed tickets that are in progress are retained.
+    Requires the ADMIN_SECRET key as a query parameter.
+    """
+    _require_admin(key)
+
+    try:
+        summary = _apply_alerts(_iter_alert_file(ALERTS_FILE), allow_empty=allow_empty)
+    except (OSError, ValueError) as e:
+        # json.JSONDecodeError is a ValueError; the previous alerts stay live
+        raise HTTPException(status_code=422, detail=f"Failed to reload alerts: {str(e)}")
+
+    return {"message": "Alerts reloaded", **summary}
+
+
+@app.post(PROFILE_ADMIN_PATH)
+def configure_profiling(request: ProfilingConfigRequest, key: str = Query(..., description="Admin secret key")):
+    """
+    Switch sampled request profiling on or off at runtime.
+    Each request is profiled with its route's rate from route_rates (falling
+    back to sample_rate); results accumulate in a bounded ring buffer.
+    Requires the ADMIN_SECRET key as a query parameter.
+    """
+    _require_admin(key)
+
+    for route, rate in request.route_rates.items():
+        if not 0.0 <= rate <= 1.0:
+            raise HTTPException(status_code=400, detail=f"Sample rate for '{route}' must be between 0 and 1")
+    if request.clear:
+        request_profiler.samples.clear()
+    request_profiler.configure(request.enabled, request.sample_rate, request.route_rates, request.memory)
+
+    return {
+        "enabled": request_profiler.enabled,
+        "sample_rate": request_profiler.sample_rate,
+        "route_rates": request_profiler.route_rates,
+        "memory": request_profiler.memory,
+        "samples": len(request_profiler.samples),
+    }
+
+
+@app.get(PROFILE_ADMIN_PATH)
+def get_profiling_report(
+    key: str = Query(..., description="Admin secret key"),
+    format: str = Query("json", description="json or collapsed (flamegraph input)"),
+    route: Optional[str] = Query(None, description="Only include samples from this route path"),
+    top: int = Query(25, ge=1, le=_PROFILE_MAX_FUNCS, description="Number of top functions / allocation sites"),
+):
+    """
+    Returns aggregated profiles of the sampled requests: top functions by
+    self time and top allocation sites as JSON, or collapsed stacks
+    ('frame;frame;frame microseconds') for flamegraph tools.
+    Requires the ADMIN_SECRET key as a query parameter.
+    """
+    _require_admin(key)
+
+    if format == "collapsed":
+        return PlainTextResponse(request_profiler.collapsed(route))
+    if format != "json":
+        raise HTTPException(status_code=400, detail=f"Invalid format '{format}'. Must be json or collapsed")
+    return request_profiler.report(route, top)
+
+
 # ──────────────────────────────────────────────
 # Entry Point
 # ──────────────────────────────────────────────
 
+def _ingest_cli(argv: list[str]):
+    """`python main.py ingest ...` — build or resume the manual index offline."""
+    import argparse
+    import shutil
+
+    parser = argparse.ArgumentParser(prog="main.py ingest", description="Ingest repair manuals into Chroma.")
+    parser.add_argument("--manuals-dir", default=MANUALS_DIR)
+    parser.add_argument("--persist-dir", default=CHROMA_PERSIST_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--rebuild", action="store_true", help="Discard the existing index and checkpoint first")
+    args = parser.parse_args(argv)
+
+    if "GOOGLE_API_KEY" not in os.environ:
+        parser.error("GOOGLE_API_KEY not found in environment.")
+    if args.rebuild and os.path.exists(args.persist_dir):
+        shutil.rmtree(args.persist_dir)
+
+    embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+    ingest_manuals(
+        embeddings,
+        manuals_dir=args.manuals_dir,
+        persist_dir=args.persist_dir,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "ingest":
+        _ingest_cli(sys.argv[2:])
+    else:
+        import uvicorn
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file